@@ -0,0 +1,117 @@
+"""
+Bulk loading for offline imports and backfills (e.g. seeding a new db or replaying historical data).
+The API's own ingest should keep using regular inserts.
+"""
+import datetime
+import enum
+import io
+import itertools
+import json
+import logging
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Integer, Table
+
+from . import config
+from .database import engine
+
+log = logging.getLogger(__name__)
+
+
+def copy_rows(table: Table, rows: Iterable[Sequence[Any]], columns: Optional[Sequence[str]] = None,
+              batch_size: int = 1000) -> int:
+    """
+    Loads *rows* (sequences of values in the order of *columns*, defaulting to all of the table's columns) into
+    *table* and commits. Returns the number of rows loaded.
+
+    On postgres, the rows are streamed through COPY FROM STDIN, so memory use stays flat for any number of rows. COPY
+    doesn't advance sequences, so the sequences of any copied serial primary key columns are moved past the copied ids
+    afterwards. Otherwise, the rows are inserted in batches of *batch_size*.
+    """
+    if columns is None:
+        columns = [c.name for c in table.columns]
+
+    if config.DB_TYPE != 'postgresql':
+        return _insert_rows(table, rows, columns, batch_size)
+
+    preparer = engine.dialect.identifier_preparer
+    table_name = preparer.format_table(table)
+    sql = f"COPY {table_name} ({', '.join(preparer.quote(c) for c in columns)}) FROM STDIN"
+    reader = _CopyReader(rows)
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.copy_expert(sql, reader)
+        # pg_get_serial_sequence is null for columns without a sequence, which makes setval a no-op
+        for column in table.primary_key.columns:
+            if column.name in columns and isinstance(column.type, Integer):
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), max({preparer.quote(column.name)})) "
+                    f"FROM {table_name}",
+                    (table_name, column.name)
+                )
+        conn.commit()
+    finally:
+        conn.close()
+    log.info(f"Copied {reader.num_rows} rows into {table.name}")
+    return reader.num_rows
+
+
+def _insert_rows(table: Table, rows: Iterable[Sequence[Any]], columns: Sequence[str], batch_size: int) -> int:
+    num_rows = 0
+    rows = iter(rows)
+    with engine.begin() as conn:
+        while batch := list(itertools.islice(rows, batch_size)):
+            conn.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+            num_rows += len(batch)
+    log.info(f"Inserted {num_rows} rows into {table.name}")
+    return num_rows
+
+
+# ==== COPY text format ====
+class _CopyReader(io.TextIOBase):
+    """A read-only file that serializes rows to COPY text format as it is read."""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._lines: Iterator[str] = map(copy_line, rows)
+        self._buf = ""
+        self.num_rows = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buf) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buf += line
+            self.num_rows += 1
+        if size is None or size < 0:
+            size = len(self._buf)
+        out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def copy_line(row: Sequence[Any]) -> str:
+    """Returns *row* as one line of postgres COPY text format (tab-separated, \\N for NULL)."""
+    return "\t".join(copy_value(v) for v in row) + "\n"
+
+
+def copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, enum.Enum):
+        # sqlalchemy's Enum type stores the member's name
+        return value.name
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value) \
+        .replace("\\", "\\\\") \
+        .replace("\t", "\\t") \
+        .replace("\n", "\\n") \
+        .replace("\r", "\\r")
@@ -16,7 +16,7 @@ log = logging.getLogger(__name__)
 
 def get_district_detail(db: Session, world: models.World, district: models.District) -> schemas.paissa.DistrictDetail:
     """Gets the district detail for a given district in a world."""
-    latest_plots = crud.get_latest_plots_in_district(db, world.id, district.id)
+    latest_plots = crud.get_latest_plots_in_district(db, world.id, district.id, load_plot_info=True)
     num_open_plots = sum(1 for p in latest_plots if not p.is_owned)
     oldest_plot_time = min(p.timestamp for p in latest_plots) if latest_plots else datetime.datetime.fromtimestamp(0)
     open_plots = []
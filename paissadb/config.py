@@ -8,6 +8,19 @@ JWT_AUDIENCES = ['PaissaHouse']
 JWT_SECRET_PAISSAHOUSE = os.getenv("JWT_SECRET_PAISSAHOUSE")
 DB_URI = os.getenv("DB_URI", "sqlite:///./sql_app.db")
 DB_TYPE = urllib.parse.urlparse(DB_URI).scheme.split('+')[0]
+# the same db using an asyncio driver, for the async ingest endpoints
+ASYNC_DB_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+ASYNC_DB_URI = os.getenv("ASYNC_DB_URI", ASYNC_DB_DRIVERS[DB_TYPE] + DB_URI[DB_URI.index(':'):])
+# postgres connection pools, per worker process: the sync pool serves the read endpoints and background tasks, the async
+# pool only the write endpoints. the defaults cap each worker at 30 connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 5))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 5))
+# minimum seconds between refreshes of the plots_current materialized view (postgres only)
+PLOTS_CURRENT_REFRESH_INTERVAL = int(os.getenv("PLOTS_CURRENT_REFRESH_INTERVAL", 30))
+# create missing tables on startup - on by default for the sqlite dev db, production uses scripts/migrations
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", str(DB_TYPE == 'sqlite')).lower() in ('1', 'true')
 WS_BACKEND_URI = os.getenv("WS_BACKEND_URI", "memory://")
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 SENTRY_ENV = os.getenv("SENTRY_ENV", "development")
@@ -1,65 +1,143 @@
 import datetime
-from typing import Iterator, List, Optional, Tuple
+import json
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import cachetools
-from sqlalchemy import desc, func, update
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import bindparam, desc, func, insert, select, text, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, selectinload
 
 from . import config, models, schemas
 
 # caching - todo move this to Redis or something if scaling is needed?
+# only used on sqlite, on postgres the latest plots are read from the plots_current view
 # 72 worlds * 4 districts = 288
 # IMPORTANT: each ingest method has to clear the cache entry it updates
 district_plot_cache: cachetools.LRUCache[Tuple[int, int], List[int]] = cachetools.LRUCache(288)
-
-
-def upsert_sweeper(db: Session, sweeper: schemas.paissa.Hello) -> models.Sweeper:
+# worlds are only written by the gamedata upsert on startup, so they're cached for the life of the process
+worlds_cache: Optional[List[Row]] = None
+# sweeper id -> last seen time, written in one batch by flush_sweeper_last_seen instead of an UPDATE per request
+sweeper_last_seen: Dict[int, datetime.datetime] = {}
+# (world id, district id) of districts ingested since the last refresh of plots_current
+plots_current_stale: Set[Tuple[int, int]] = set()
+
+# statements used on every request are built once here and take their values as bound parameters
+_worlds_stmt = select(models.World.id, models.World.name)
+_world_by_id_stmt = select(models.World).where(models.World.id == bindparam("world_id"))
+_districts_stmt = select(models.District)
+_district_by_id_stmt = select(models.District).where(models.District.id == bindparam("district_id"))
+_wardsweep_by_id_stmt = select(models.WardSweep) \
+    .options(selectinload(models.WardSweep.plots).selectinload(models.Plot.plot_info)) \
+    .where(models.WardSweep.id == bindparam("wardsweep_id"))
+_plots_by_ids_stmt = select(models.Plot).where(models.Plot.id.in_(bindparam("plot_ids", expanding=True)))
+_plots_by_ids_with_info_stmt = _plots_by_ids_stmt.options(selectinload(models.Plot.plot_info))
+_plots_current_in_district_stmt = select(models.Plot).from_statement(
+    select(models.plots_current)
+        .where(models.plots_current.c.world_id == bindparam("world_id"),
+               models.plots_current.c.territory_type_id == bindparam("district_id"))
+        .order_by(models.plots_current.c.ward_number, models.plots_current.c.plot_number)
+)
+_plots_current_in_district_with_info_stmt = _plots_current_in_district_stmt \
+    .options(selectinload(models.Plot.plot_info))
+_refresh_plots_current_stmt = text("REFRESH MATERIALIZED VIEW CONCURRENTLY plots_current")
+_sweeper_last_seen_stmt = update(models.Sweeper.__table__) \
+    .where(models.Sweeper.__table__.c.id == bindparam("b_id")) \
+    .values(last_seen=bindparam("b_last_seen"))
+_insert_event_stmt = insert(models.Event)
+_insert_wardsweep_stmt = insert(models.WardSweep)
+_insert_plot_stmt = insert(models.Plot)
+# postgres: inserts the event and its wardsweep in one round trip, returning (event_id, wardsweep_id)
+_new_event_cte = insert(models.Event) \
+    .values(sweeper_id=bindparam("sweeper_id"), timestamp=bindparam("timestamp"),
+            event_type=bindparam("event_type"), data=bindparam("data")) \
+    .returning(models.Event.id) \
+    .cte("new_event")
+_insert_event_and_wardsweep_stmt = insert(models.WardSweep) \
+    .from_select(
+        ["sweeper_id", "world_id", "territory_type_id", "ward_number", "timestamp", "event_id"],
+        select(bindparam("sweeper_id", type_=models.WardSweep.sweeper_id.type),
+               bindparam("world_id", type_=models.WardSweep.world_id.type),
+               bindparam("territory_type_id", type_=models.WardSweep.territory_type_id.type),
+               bindparam("ward_number", type_=models.WardSweep.ward_number.type),
+               bindparam("timestamp", type_=models.WardSweep.timestamp.type),
+               _new_event_cte.c.id)
+    ) \
+    .returning(models.WardSweep.event_id, models.WardSweep.id)
+
+
+async def upsert_sweeper(db: AsyncSession, sweeper: schemas.paissa.Hello) -> models.Sweeper:
     db_sweeper = models.Sweeper(id=sweeper.cid, name=sweeper.name, world_id=sweeper.worldId)
-    merged = db.merge(db_sweeper)
-    db.commit()
+    merged = await db.merge(db_sweeper)
+    await db.commit()
     return merged
 
 
-def touch_sweeper_by_id(db: Session, sweeper_id: int):
-    stmt = update(models.Sweeper).where(models.Sweeper.id == sweeper_id)
-    db.execute(stmt)
+def touch_sweeper_by_id(sweeper_id: int):
+    """Marks the sweeper as seen now. The time is written to the db on the next flush_sweeper_last_seen."""
+    sweeper_last_seen[sweeper_id] = datetime.datetime.now()
+
+
+def flush_sweeper_last_seen(db: Session):
+    """Writes all pending sweeper last seen times in one batched UPDATE."""
+    params = []
+    # popitem is atomic, so touches that happen during the flush are kept for the next one
+    while sweeper_last_seen:
+        sweeper_id, last_seen = sweeper_last_seen.popitem()
+        params.append({"b_id": sweeper_id, "b_last_seen": last_seen})
+    if not params:
+        return
+    db.execute(_sweeper_last_seen_stmt, params)
     db.commit()
 
 
-def get_worlds(db: Session) -> List[models.World]:
-    return db.query(models.World).all()
+def get_worlds(db: Session) -> List[Row]:
+    """Returns (id, name) rows for all worlds."""
+    global worlds_cache
+    if worlds_cache is None:
+        # assigned in one step so concurrent first calls (sync endpoints run in a threadpool) can't both fill it
+        worlds_cache = db.execute(_worlds_stmt).all()
+    return worlds_cache
 
 
 def get_world_by_id(db: Session, world_id: int) -> models.World:
-    return db.query(models.World).filter(models.World.id == world_id).first()
+    return db.execute(_world_by_id_stmt, {"world_id": world_id}).scalars().first()
 
 
 def get_districts(db: Session) -> List[models.District]:
-    return db.query(models.District).all()
+    return db.execute(_districts_stmt).scalars().all()
 
 
 def get_district_by_id(db: Session, district_id: int) -> models.District:
-    return db.query(models.District).filter(models.District.id == district_id).first()
+    return db.execute(_district_by_id_stmt, {"district_id": district_id}).scalars().first()
 
 
 def get_wardsweep_by_id(db: Session, wardsweep_id: int) -> models.WardSweep:
-    return db.query(models.WardSweep).filter(models.WardSweep.id == wardsweep_id).first()
+    return db.execute(_wardsweep_by_id_stmt, {"wardsweep_id": wardsweep_id}).scalars().first()
 
 
-def get_plots_by_ids(db: Session, plot_ids: List[int]) -> List[models.Plot]:
-    return db.query(models.Plot).filter(models.Plot.id.in_(plot_ids)).all()
+def get_plots_by_ids(db: Session, plot_ids: List[int], load_plot_info: bool = False) -> List[models.Plot]:
+    stmt = _plots_by_ids_with_info_stmt if load_plot_info else _plots_by_ids_stmt
+    return db.execute(stmt, {"plot_ids": plot_ids}).scalars().all()
 
 
 def get_latest_plots_in_district(
         db: Session,
         world_id: int,
         district_id: int,
-        use_cache: bool = False) -> List[models.Plot]:
+        use_cache: bool = False,
+        load_plot_info: bool = False) -> List[models.Plot]:
     """
     Gets the latest plots in the district. Note that if *use_cache* is True, the returned objects will be
     detached.
+    If *load_plot_info* is True, each plot's plot_info is eagerly loaded in one extra query instead of once per plot
+    (use this if the caller needs num_devals or the house size).
+
+    On postgres, this reads the plots_current materialized view, so it lags ingest by up to one refresh. The view
+    already is an indexed snapshot, so *use_cache* is ignored there (looking plots up by id alone can't prune the
+    plots partitions).
 
-    Warning: slow! (~70ms)
+    Warning: slow on sqlite! (~70ms)
     """
     # sqlite:
     # SELECT * FROM plots
@@ -73,35 +151,51 @@ def get_latest_plots_in_district(
     #     ON plots.id = latest_plots.id;
     #
     # postgres:
-    # note that running this query in a postgres connection "upgrades" the transaction to 32MB work mem
-    # SET LOCAL work_mem = '32MB';
-    # SELECT DISTINCT ON (ward_number, plot_number) *
-    #     FROM plots
+    # SELECT * FROM plots_current
     #     WHERE world_id = ?
     #         AND territory_type_id = ?
-    #     ORDER BY ward_number, plot_number, timestamp DESC;
-
-    if use_cache and (cached := district_plot_cache.get((world_id, district_id))) is not None:
-        return get_plots_by_ids(db, cached)
+    #     ORDER BY ward_number, plot_number;
 
     if config.DB_TYPE == 'postgresql':
-        db.execute("SET LOCAL work_mem = '32MB'")
-        stmt = db.query(models.Plot) \
-            .distinct(models.Plot.ward_number, models.Plot.plot_number) \
-            .filter(models.Plot.world_id == world_id, models.Plot.territory_type_id == district_id) \
-            .order_by(models.Plot.ward_number, models.Plot.plot_number, desc(models.Plot.timestamp))
-    else:
-        subq = db.query(models.Plot.id, func.max(models.Plot.timestamp)) \
-            .filter(models.Plot.world_id == world_id, models.Plot.territory_type_id == district_id) \
-            .group_by(models.Plot.ward_number, models.Plot.plot_number) \
-            .subquery()
-        latest_plots = aliased(models.Plot, subq)
-        stmt = db.query(models.Plot).join(latest_plots, models.Plot.id == latest_plots.id)
+        stmt = _plots_current_in_district_with_info_stmt if load_plot_info else _plots_current_in_district_stmt
+        return db.execute(stmt, {"world_id": world_id, "district_id": district_id}).scalars().all()
+
+    if use_cache and (cached := district_plot_cache.get((world_id, district_id))) is not None:
+        return get_plots_by_ids(db, cached, load_plot_info)
+
+    subq = db.query(models.Plot.id, func.max(models.Plot.timestamp)) \
+        .filter(models.Plot.world_id == world_id, models.Plot.territory_type_id == district_id) \
+        .group_by(models.Plot.ward_number, models.Plot.plot_number) \
+        .subquery()
+    latest_plots = aliased(models.Plot, subq)
+    stmt = db.query(models.Plot).join(latest_plots, models.Plot.id == latest_plots.id)
+    if load_plot_info:
+        stmt = stmt.options(selectinload(models.Plot.plot_info))
     result = stmt.all()
     district_plot_cache[world_id, district_id] = [p.id for p in result]
     return result
 
 
+def refresh_plots_current(db: Session):
+    """
+    Refreshes the plots_current materialized view if anything was ingested since the last refresh. No-op if not on
+    postgres.
+    """
+    if config.DB_TYPE != 'postgresql' or not plots_current_stale:
+        return
+    # districts ingested while this runs stay in the set for the next refresh
+    stale = set()
+    while plots_current_stale:
+        stale.add(plots_current_stale.pop())
+    try:
+        db.execute(_refresh_plots_current_stmt)
+        db.commit()
+    except Exception:
+        # retry them on the next refresh
+        plots_current_stale.update(stale)
+        raise
+
+
 def get_plot_states_before(
         db: Session,
         world_id: int,
@@ -168,61 +262,91 @@ def plot_history(db: Session, plot: models.Plot, before: datetime.datetime = Non
 
 
 # ---- ingest ----
-def _ingest(db: Session, event: schemas.ffxiv.BaseFFXIVPacket, sweeper: Optional[schemas.paissa.JWTSweeper]):
-    """Logs the packet to the events table. Does not commit - ingest method that calls this should."""
-    sweeper_id = sweeper.cid if sweeper is not None else None
-    db_event = models.Event(
-        sweeper_id=sweeper_id,
-        timestamp=datetime.datetime.now(),
+def _strip_null_chars(value):
+    """Removes null characters from the strings in decoded JSON, postgres can't store them in jsonb."""
+    if isinstance(value, str):
+        return value.replace('\x00', '')
+    if isinstance(value, dict):
+        return {_strip_null_chars(k): _strip_null_chars(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_strip_null_chars(v) for v in value]
+    return value
+
+
+def _event_data(
+        event: schemas.ffxiv.BaseFFXIVPacket,
+        sweeper: Optional[schemas.paissa.JWTSweeper],
+        timestamp: datetime.datetime) -> dict:
+    return dict(
+        sweeper_id=sweeper.cid if sweeper is not None else None,
+        timestamp=timestamp,
         event_type=event.event_type,
-        data=event.json().replace('\x00', '')  # remove any null bytes that might sneak in somehow
+        data=_strip_null_chars(json.loads(event.json()))
     )
-    db.add(db_event)
-    return db_event
 
 
-def ingest_wardinfo(
-        db: Session,
+async def _ingest(
+        db: AsyncSession,
+        event: schemas.ffxiv.BaseFFXIVPacket,
+        sweeper: Optional[schemas.paissa.JWTSweeper]) -> Tuple[int, datetime.datetime]:
+    """
+    Logs the packet to the events table and returns the new event's id and timestamp.
+    Does not commit - ingest method that calls this should.
+    """
+    timestamp = datetime.datetime.now()
+    # the pk is fetched in the same round trip (INSERT ... RETURNING on postgres)
+    result = await db.execute(_insert_event_stmt, _event_data(event, sweeper, timestamp))
+    return result.inserted_primary_key[0], timestamp
+
+
+async def ingest_wardinfo(
+        db: AsyncSession,
         wardinfo: schemas.ffxiv.HousingWardInfo,
-        sweeper: Optional[schemas.paissa.JWTSweeper]) -> models.WardSweep:
-    event = _ingest(db, wardinfo, sweeper)
-    db_wardsweep = models.WardSweep(
-        sweeper_id=event.sweeper_id,
+        sweeper: Optional[schemas.paissa.JWTSweeper]) -> int:
+    """Ingests a HousingWardInfo packet and returns the id of the created wardsweep."""
+    wardsweep_data = dict(
+        sweeper_id=sweeper.cid if sweeper is not None else None,
         world_id=wardinfo.LandIdent.WorldId,
         territory_type_id=wardinfo.LandIdent.TerritoryTypeId,
         ward_number=wardinfo.LandIdent.WardNumber,
-        timestamp=event.timestamp,
-        event=event
     )
+    if config.DB_TYPE == 'postgresql':
+        # each insert needs the previous one's id, so instead of running them concurrently the event and wardsweep
+        # are chained in one statement
+        timestamp = datetime.datetime.now()
+        result = await db.execute(_insert_event_and_wardsweep_stmt,
+                                  {**_event_data(wardinfo, sweeper, timestamp), **wardsweep_data})
+        event_id, wardsweep_id = result.one()
+    else:
+        event_id, timestamp = await _ingest(db, wardinfo, sweeper)
+        wardsweep_data.update(timestamp=timestamp, event_id=event_id)
+        wardsweep_id = (await db.execute(_insert_wardsweep_stmt, wardsweep_data)).inserted_primary_key[0]
 
+    # the plots are written as one multi-row insert instead of going through the unit of work one by one
     plots = []
     for i, plot in enumerate(wardinfo.HouseInfoEntries):
         is_owned = bool(plot.InfoFlags & schemas.ffxiv.HousingFlags.PlotOwned)
         owner_name = plot.EstateOwnerName if is_owned else ""
-        db_plot = models.Plot(
+        plots.append(dict(
             # plot location info
             world_id=wardinfo.LandIdent.WorldId,
             territory_type_id=wardinfo.LandIdent.TerritoryTypeId,
             ward_number=wardinfo.LandIdent.WardNumber,
             plot_number=i,
-            timestamp=event.timestamp,
+            timestamp=timestamp,
             # plot info
             is_owned=is_owned,
             has_built_house=bool(plot.InfoFlags & schemas.ffxiv.HousingFlags.HouseBuilt),
             house_price=plot.HousePrice,
             owner_name=owner_name,
             # references
-            sweep=db_wardsweep,
-            event=event,
-        )
-        plots.append(db_plot)
+            sweep_id=wardsweep_id,
+            event_id=event_id,
+        ))
+    await db.execute(_insert_plot_stmt, plots)
     # commit
-    db_wardsweep.plots = plots
-    event.plots = plots
-    db.add(db_wardsweep)
-    db.add_all(plots)
-    db.commit()
-    db.refresh(db_wardsweep)
+    await db.commit()
     # evict stale cache entry
-    district_plot_cache.pop((db_wardsweep.world_id, db_wardsweep.territory_type_id), None)
-    return db_wardsweep
+    district_plot_cache.pop((wardinfo.LandIdent.WorldId, wardinfo.LandIdent.TerritoryTypeId), None)
+    plots_current_stale.add((wardinfo.LandIdent.WorldId, wardinfo.LandIdent.TerritoryTypeId))
+    return wardsweep_id
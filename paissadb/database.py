@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from . import config
@@ -8,10 +9,27 @@ engine_kwargs = {}
 if config.DB_TYPE == 'sqlite':
     engine_kwargs.update(connect_args={"check_same_thread": False})
 elif config.DB_TYPE == 'postgresql':
-    engine_kwargs.update(pool_size=10, max_overflow=20)
+    engine_kwargs.update(pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW,
+                         # check connections on checkout and recycle them before the server drops them as idle
+                         pool_pre_ping=True,
+                         pool_recycle=1800,
+                         # psycopg2 fast execution helpers: multi-VALUES INSERTs, batched UPDATEs/DELETEs
+                         executemany_mode="values_plus_batch",
+                         executemany_values_page_size=1000,
+                         executemany_batch_page_size=500)
 
 engine = create_engine(config.DB_URI, **engine_kwargs, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# async engine, used by the write endpoints so they don't tie up a threadpool worker for each request
+async_engine_kwargs = {}
+
+if config.DB_TYPE == 'postgresql':
+    async_engine_kwargs.update(pool_size=config.ASYNC_DB_POOL_SIZE, max_overflow=config.ASYNC_DB_MAX_OVERFLOW,
+                               pool_pre_ping=True, pool_recycle=1800)
+
+async_engine = create_async_engine(config.ASYNC_DB_URI, **async_engine_kwargs, echo=False)
+AsyncSessionLocal = sessionmaker(autoflush=False, bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -22,3 +40,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
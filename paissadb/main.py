@@ -9,14 +9,17 @@ import sentry_sdk
 import sqlalchemy.exc
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, WebSocket, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from . import auth, calc, config, crud, gamedata, metrics, models, schemas, ws
-from .database import SessionLocal, engine, get_db
+from .database import SessionLocal, engine, get_async_db, get_db
 
-models.Base.metadata.create_all(bind=engine)
+if config.AUTO_CREATE_SCHEMA:
+    models.Base.metadata.create_all(bind=engine)
 with SessionLocal() as sess:
     gamedata.upsert_all(gamedata_dir=config.GAMEDATA_DIR, db=sess)
 
@@ -25,7 +28,7 @@ if 'debug' in sys.argv:
     # noinspection PyArgumentList
     logging.basicConfig(stream=sys.stdout, encoding='utf-8', level=logging.DEBUG)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # ==== Middleware ====
 # CORS
@@ -46,39 +49,40 @@ metrics.register(app)
 
 # ==== HTTP ====
 @app.post("/wardInfo", status_code=202)
-def ingest_wardinfo(
+async def ingest_wardinfo(
         wardinfo: schemas.ffxiv.HousingWardInfo,
         background: BackgroundTasks,
         sweeper: schemas.paissa.JWTSweeper = Depends(auth.required),
-        db: Session = Depends(get_db)):
+        db: AsyncSession = Depends(get_async_db)):
     log.debug("Received wardInfo:")
     log.debug(wardinfo.json())
 
     try:
-        wardsweep = crud.ingest_wardinfo(db, wardinfo, sweeper)
+        wardsweep_id = await crud.ingest_wardinfo(db, wardinfo, sweeper)
     except sqlalchemy.exc.IntegrityError:
-        db.rollback()
+        await db.rollback()
         try:
-            wardsweep = crud.ingest_wardinfo(db, wardinfo, None)
+            wardsweep_id = await crud.ingest_wardinfo(db, wardinfo, None)
         except sqlalchemy.exc.IntegrityError:
             raise HTTPException(400, "Could not ingest sweep")
 
-    db.close()
-    background.add_task(ws.queue_wardsweep_for_processing, wardsweep)
+    await db.close()
+    crud.touch_sweeper_by_id(sweeper.cid)
+    background.add_task(ws.queue_wardsweep_for_processing, wardsweep_id)
     return {"message": "OK"}
 
 
 @app.post("/hello")
-def hello(
+async def hello(
         data: schemas.paissa.Hello,
         sweeper: schemas.paissa.JWTSweeper = Depends(auth.required),
-        db: Session = Depends(get_db)):
+        db: AsyncSession = Depends(get_async_db)):
     if sweeper.cid != data.cid:
         raise HTTPException(400, "Token CID and given CID do not match")
     log.debug("Received hello:")
     log.debug(data.json())
-    crud.upsert_sweeper(db, data)
-    crud.touch_sweeper_by_id(db, sweeper.cid)
+    await crud.upsert_sweeper(db, data)
+    crud.touch_sweeper_by_id(sweeper.cid)
     return {"message": "OK"}
 
 
@@ -141,6 +145,49 @@ def get_district_detail(world_id: int, district_id: int, db: Session = Depends(g
     return calc.get_district_detail(db, world, district)
 
 
+# ==== Tasks ====
+async def flush_sweeper_last_seen(delay=5):
+    """Writes the batched sweeper last seen times to the db every *delay* seconds."""
+    while True:
+        try:
+            await asyncio.sleep(delay)
+            with SessionLocal() as db:
+                await asyncio.get_running_loop().run_in_executor(None, crud.flush_sweeper_last_seen, db)
+        except asyncio.CancelledError:
+            break
+        except Exception:
+            log.exception("Failed to flush sweeper last seen times:")
+
+
+async def refresh_plots_current(delay=config.PLOTS_CURRENT_REFRESH_INTERVAL):
+    """
+    Refreshes plots_current at most every *delay* seconds. Each refresh rescans all of plots, so this bounds that
+    cost under constant ingest, at the price of the latest plot states lagging by up to *delay* seconds.
+    """
+    while True:
+        try:
+            await asyncio.sleep(delay)
+            with SessionLocal() as db:
+                await asyncio.get_running_loop().run_in_executor(None, crud.refresh_plots_current, db)
+        except asyncio.CancelledError:
+            break
+        except Exception:
+            log.exception("Failed to refresh plots_current:")
+
+
+@app.on_event("startup")
+async def start_sweeper_flush():
+    # these never get cancelled explicitly, they're just killed when the app dies
+    asyncio.create_task(flush_sweeper_last_seen())
+    asyncio.create_task(refresh_plots_current())
+
+
+@app.on_event("shutdown")
+async def final_sweeper_flush():
+    with SessionLocal() as db:
+        await asyncio.get_running_loop().run_in_executor(None, crud.flush_sweeper_last_seen, db)
+
+
 # ==== WS ====
 @app.on_event("startup")
 async def connect_broadcast():
@@ -157,10 +204,10 @@ async def disconnect_broadcast():
 
 
 @app.websocket("/ws")
-async def plot_updates(websocket: WebSocket, jwt: Optional[str] = None, db: Session = Depends(get_db)):
+async def plot_updates(websocket: WebSocket, jwt: Optional[str] = None):
     # token must be present
     if jwt is None:
-        await ws.connect(db, websocket, None)  # fixme
+        await ws.connect(websocket, None)  # fixme
         # await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
@@ -171,4 +218,4 @@ async def plot_updates(websocket: WebSocket, jwt: Optional[str] = None, db: Sess
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await ws.connect(db, websocket, sweeper)
+    await ws.connect(websocket, sweeper)
@@ -1,14 +1,19 @@
 import enum
 from typing import Optional
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime, Enum, ForeignKey, ForeignKeyConstraint, Index, Integer, \
-    String, UnicodeText, func
+from sqlalchemy import BigInteger, Boolean, Column, DDL, DateTime, Enum, ForeignKey, ForeignKeyConstraint, Index, \
+    Integer, JSON, MetaData, String, Table, case, cast, event, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
+from . import config
 from .database import Base
 
 UNKNOWN_OWNER = "Unknown"
-HOUSING_DEVAL_FACTOR = 0.0042
+# each devalue takes 0.42% off the base price, kept as a fraction for integer math
+HOUSING_DEVAL_FACTOR_NUM = 42
+HOUSING_DEVAL_FACTOR_DEN = 10000
 
 
 class EventType(enum.Enum):
@@ -35,11 +40,9 @@ class Sweeper(Base):
     id = Column(BigInteger, primary_key=True)
     name = Column(String)
     world_id = Column(Integer, ForeignKey("worlds.id"))
-    last_seen = Column(DateTime, nullable=True, server_default=func.now(), onupdate=func.now())
+    last_seen = Column(DateTime, nullable=True, server_default=func.now())  # see crud.touch_sweeper_by_id
 
-    world = relationship("World", back_populates="sweepers")
-    sweeps = relationship("WardSweep", back_populates="sweeper")
-    events = relationship("Event", back_populates="sweeper")
+    world = relationship("World", lazy="raise")
 
 
 class World(Base):
@@ -48,10 +51,6 @@ class World(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
 
-    sweepers = relationship("Sweeper", back_populates="world")
-    sweeps = relationship("WardSweep", back_populates="world")
-    plots = relationship("Plot", back_populates="world")
-
 
 class District(Base):
     __tablename__ = "districts"
@@ -70,7 +69,7 @@ class PlotInfo(Base):
     house_size = Column(Integer)
     house_base_price = Column(Integer)
 
-    district = relationship("District", viewonly=True)
+    district = relationship("District", viewonly=True, lazy="raise")
 
 
 class WardSweep(Base):
@@ -84,11 +83,11 @@ class WardSweep(Base):
     ward_number = Column(Integer)
     timestamp = Column(DateTime)
 
-    sweeper = relationship("Sweeper", back_populates="sweeps")
-    world = relationship("World", back_populates="sweeps")
+    sweeper = relationship("Sweeper", lazy="raise")
+    world = relationship("World", lazy="raise")
     plots = relationship("Plot", back_populates="sweep")
-    district = relationship("District", viewonly=True)
-    event = relationship("Event")
+    district = relationship("District", viewonly=True, lazy="raise")
+    event = relationship("Event", lazy="raise")
 
 
 Index("ix_wardsweeps_event_id_desc", WardSweep.event_id.desc())  # NULLS LAST
@@ -99,14 +98,17 @@ class Plot(Base):
     __table_args__ = (
         ForeignKeyConstraint(("territory_type_id", "plot_number"),
                              ("plotinfo.territory_type_id", "plotinfo.plot_number")),
+        # on postgres, plots is partitioned by month (see scripts/migrations/10_2026_03_partition_plots.sql)
+        {"postgresql_partition_by": "RANGE (timestamp)"}
     )
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     world_id = Column(Integer, ForeignKey("worlds.id"))
     territory_type_id = Column(Integer, ForeignKey("districts.id"))
     ward_number = Column(Integer)
     plot_number = Column(Integer)
-    timestamp = Column(DateTime)
+    # postgres requires the partition key to be part of the pk, sqlite can only autoincrement a single-column pk
+    timestamp = Column(DateTime, primary_key=config.DB_TYPE == 'postgresql')
     sweep_id = Column(Integer, ForeignKey("wardsweeps.id", ondelete="SET NULL"), nullable=True)
     event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"))
 
@@ -115,13 +117,13 @@ class Plot(Base):
     house_price = Column(Integer, nullable=True)  # null for unknown price
     owner_name = Column(String, nullable=True)  # "Unknown" for unknown owner (UNKNOWN_OWNER), used to build relo graph
 
-    sweep = relationship("WardSweep", back_populates="plots")
-    event = relationship("Event", back_populates="plots")
-    world = relationship("World", back_populates="plots")
+    sweep = relationship("WardSweep", back_populates="plots", lazy="raise")
+    event = relationship("Event", lazy="raise")
+    world = relationship("World", lazy="raise")
     district = relationship("District", viewonly=True)
     plot_info = relationship("PlotInfo", viewonly=True)
 
-    @property
+    @hybrid_property
     def num_devals(self) -> Optional[int]:
         """
         Returns the number of price this house has devalued. If the price is unknown, returns None.
@@ -132,17 +134,67 @@ class Plot(Base):
         max_price = self.plot_info.house_base_price
         if self.house_price >= max_price:
             return 0
-        return round((max_price - self.house_price) / (HOUSING_DEVAL_FACTOR * max_price))
-
+        # round((max - price) / (factor * max)), rounding halves up
+        return ((max_price - self.house_price) * 2 * HOUSING_DEVAL_FACTOR_DEN + HOUSING_DEVAL_FACTOR_NUM * max_price) \
+               // (2 * HOUSING_DEVAL_FACTOR_NUM * max_price)
+
+    @num_devals.expression
+    def num_devals(cls):
+        # correlated on plotinfo so the expression can be used in a query without an explicit join
+        # same integer math as above; bigint since the numerator overflows int4 for expensive houses
+        max_price = cast(PlotInfo.house_base_price, BigInteger)
+        return select(case(
+            (cls.house_price >= max_price, 0),
+            else_=((max_price - cls.house_price) * 2 * HOUSING_DEVAL_FACTOR_DEN + HOUSING_DEVAL_FACTOR_NUM * max_price)
+                  / (2 * HOUSING_DEVAL_FACTOR_NUM * max_price)
+        )).where(PlotInfo.territory_type_id == cls.territory_type_id, PlotInfo.plot_number == cls.plot_number) \
+            .scalar_subquery()
+
+
+# monthly partitions, same as scripts/migrations/10_2026_03_partition_plots.sql
+# next month's partition has to be created ahead of time (see README), rows without one go to plots_default
+event.listen(Plot.__table__, "after_create", DDL("""
+    CREATE OR REPLACE FUNCTION create_plots_partition(month date) RETURNS void AS
+    $$
+    DECLARE
+        start_ts timestamp := date_trunc('month', month);
+    BEGIN
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %%I PARTITION OF plots FOR VALUES FROM (%%L) TO (%%L)',
+                       'plots_' || to_char(start_ts, 'YYYY_MM'), start_ts, start_ts + '1 month'::interval);
+    END
+    $$ LANGUAGE plpgsql
+""").execute_if(dialect="postgresql"))
+event.listen(Plot.__table__, "after_create",
+             DDL("CREATE TABLE plots_default PARTITION OF plots DEFAULT").execute_if(dialect="postgresql"))
+event.listen(Plot.__table__, "after_create", DDL("""
+    SELECT create_plots_partition(now()::date), create_plots_partition((now() + '1 month'::interval)::date)
+""").execute_if(dialect="postgresql"))
 
 # common query indices
+# covers the columns read when summarizing the latest plot states so postgres can use an index-only scan
 Index("ix_plots_world_id_territory_type_id_ward_number_plot_number",
-      Plot.world_id, Plot.territory_type_id, Plot.ward_number, Plot.plot_number)
+      Plot.world_id, Plot.territory_type_id, Plot.ward_number, Plot.plot_number,
+      postgresql_include=["timestamp", "owner_name", "house_price", "is_owned"])
 Index("ix_plots_ward_number_plot_number_timestamp_desc", Plot.ward_number, Plot.plot_number, Plot.timestamp.desc())
-# FK indices
+# FK indices (wardsweep plot loading, event delete cascade)
+# timestamp ranges are served by partition pruning instead of an index of their own
 Index("ix_plots_sweep_id_desc", Plot.sweep_id.desc())
 Index("ix_plots_event_id_desc", Plot.event_id.desc())
-Index("ix_plots_timestamp_desc", Plot.timestamp.desc())
+
+# latest state of each plot (postgres only), refreshed by crud.refresh_plots_current
+# this is a materialized view, so it's kept out of Base.metadata to stop create_all from creating it as a table
+plots_current = Table("plots_current", MetaData(), *(Column(c.name, c.type) for c in Plot.__table__.columns))
+event.listen(Plot.__table__, "after_create", DDL("""
+    CREATE MATERIALIZED VIEW plots_current AS
+    SELECT DISTINCT ON (world_id, territory_type_id, ward_number, plot_number) *
+    FROM plots
+    ORDER BY world_id, territory_type_id, ward_number, plot_number, timestamp DESC
+""").execute_if(dialect="postgresql"))
+# required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+event.listen(Plot.__table__, "after_create", DDL("""
+    CREATE UNIQUE INDEX ix_plots_current_world_id_territory_type_id_ward_plot
+    ON plots_current (world_id, territory_type_id, ward_number, plot_number)
+""").execute_if(dialect="postgresql"))
 
 
 # store of all ingested events for later analysis (e.g. FC/player ownership, relocation/resell graphs, etc)
@@ -153,7 +205,12 @@ class Event(Base):
     sweeper_id = Column(BigInteger, ForeignKey("sweepers.id", ondelete="SET NULL"), nullable=True, index=True)
     timestamp = Column(DateTime, index=True)
     event_type = Column(Enum(EventType), index=True)
-    data = Column(UnicodeText)
+    data = Column(JSON().with_variant(postgresql.JSONB(), 'postgresql'))
+
+    sweeper = relationship("Sweeper", lazy="raise")
+
 
-    sweeper = relationship("Sweeper", back_populates="events")
-    plots = relationship("Plot", back_populates="event", cascade="all, delete", passive_deletes=True)
+# for containment queries on the payload (data @> '{...}'), postgres only - elsewhere it would be a btree copy of data
+event.listen(Event.__table__, "after_create",
+             DDL("CREATE INDEX ix_events_data_gin ON events USING gin (data jsonb_path_ops)")
+             .execute_if(dialect="postgresql"))
@@ -19,11 +19,11 @@ broadcast_process_queue = asyncio.Queue()
 
 
 # ==== lifecycle ====
-async def connect(db: Session, websocket: WebSocket, user: Optional[schemas.paissa.JWTSweeper]):
+async def connect(websocket: WebSocket, user: Optional[schemas.paissa.JWTSweeper]):
     """Accepts the websocket connection and sets up its ping and broadcast listeners."""
     await websocket.accept()
     if user is not None:
-        await asyncio.get_running_loop().run_in_executor(None, crud.touch_sweeper_by_id, db, user.cid)
+        crud.touch_sweeper_by_id(user.cid)
 
     task = asyncio.gather(
         ping(websocket),
@@ -60,8 +60,8 @@ async def listener(websocket: WebSocket):
 
 
 # ==== processing tasks ====
-async def queue_wardsweep_for_processing(wardsweep: models.WardSweep):
-    await broadcast_process_queue.put(wardsweep.id)
+async def queue_wardsweep_for_processing(wardsweep_id: int):
+    await broadcast_process_queue.put(wardsweep_id)
     if (qsize := broadcast_process_queue.qsize()) > 50:
         log.warning(f"Broadcast process queue is getting large! ({qsize=})")
 
@@ -0,0 +1,16 @@
+-- plots covering index
+-- Oct 15, 2026
+-- Recreates the following indices:
+-- ix_plots_world_id_territory_type_id_ward_number_plot_number: add INCLUDE (timestamp, owner_name, house_price, is_owned)
+--
+-- Run without -1: VACUUM cannot run inside a transaction block. The index rebuild blocks writes to plots, so run this
+-- off-peak.
+
+DROP INDEX ix_plots_world_id_territory_type_id_ward_number_plot_number;
+
+CREATE INDEX ix_plots_world_id_territory_type_id_ward_number_plot_number
+    ON plots (world_id, territory_type_id, ward_number, plot_number)
+    INCLUDE (timestamp, owner_name, house_price, is_owned);
+
+-- index-only scans skip the heap only for pages marked all-visible
+VACUUM ANALYZE plots;
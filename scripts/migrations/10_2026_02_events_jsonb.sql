@@ -0,0 +1,15 @@
+-- events jsonb
+-- Oct 15, 2026
+-- Alters the following columns:
+-- events.data: UnicodeText -> JSONB
+--
+-- Adds the following indices:
+-- ix_events_data_gin: GIN (data jsonb_path_ops)
+
+-- escaped null bytes are valid json text but can't be stored in jsonb
+-- note that this replaces the escaped text, so a string containing a literal backslash followed by "u0000" is altered
+-- too (the server strips null characters from the decoded values instead, see crud._strip_null_chars)
+ALTER TABLE events
+    ALTER COLUMN data TYPE jsonb USING replace(data, '\u0000', '')::jsonb;
+
+CREATE INDEX ix_events_data_gin ON events USING gin (data jsonb_path_ops);
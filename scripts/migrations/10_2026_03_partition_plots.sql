@@ -0,0 +1,92 @@
+-- plots partitioning
+-- Oct 15, 2026
+-- Converts plots into a table range partitioned by month on timestamp, so that queries and maintenance on recent
+-- data only touch recent partitions and old months can be detached and archived as a whole.
+--
+-- Alters the following columns:
+-- plots.timestamp: add NOT NULL constraint, now part of the primary key (id, timestamp)
+--
+-- Adds the following tables:
+-- plots_default: default partition, catches rows that have no monthly partition
+-- plots_YYYY_MM: one partition per month, from the oldest row up to next month
+--
+-- Drops the following indices:
+-- ix_plots_timestamp_desc: not recreated, partition pruning covers timestamp ranges
+--
+-- Adds the following functions:
+-- create_plots_partition(month date): creates the partition for the month containing the given date
+--
+-- Partitions must exist before rows for their month are inserted, or the rows go to plots_default (and that month's
+-- partition can then only be created after moving them out). Create next month's partition ahead of time, e.g.:
+-- cron: 0 8 1 * * sudo -u paissadb psql -c "SELECT create_plots_partition((now() + '1 month'::interval)::date)" paissadb
+--
+-- Run with -1. This rewrites the whole table and holds a lock on it while doing so, so run it off-peak.
+
+CREATE OR REPLACE FUNCTION create_plots_partition(month date) RETURNS void AS
+$$
+DECLARE
+    start_ts timestamp := date_trunc('month', month);
+BEGIN
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF plots FOR VALUES FROM (%L) TO (%L)',
+                   'plots_' || to_char(start_ts, 'YYYY_MM'), start_ts, start_ts + '1 month'::interval);
+END
+$$ LANGUAGE plpgsql;
+
+-- move the old table out of the way, keeping the id sequence for the new one
+ALTER TABLE plots
+    RENAME TO plots_old;
+ALTER TABLE plots_old
+    RENAME CONSTRAINT plots_pkey TO plots_old_pkey;
+ALTER SEQUENCE plots_id_seq OWNED BY NONE;
+DROP INDEX ix_plots_world_id_territory_type_id_ward_number_plot_number;
+DROP INDEX ix_plots_ward_number_plot_number_timestamp_desc;
+DROP INDEX ix_plots_sweep_id_desc;
+DROP INDEX ix_plots_event_id_desc;
+DROP INDEX ix_plots_timestamp_desc;
+-- constraint names are only unique per table, but drop these so the new table gets the same names
+ALTER TABLE plots_old
+    DROP CONSTRAINT plots_event_id_fkey,
+    DROP CONSTRAINT plots_sweep_id_fkey,
+    DROP CONSTRAINT plots_territory_type_id_fkey,
+    DROP CONSTRAINT plots_territory_type_id_plot_number_fkey,
+    DROP CONSTRAINT plots_world_id_fkey;
+
+CREATE TABLE plots
+(
+    id                integer                     NOT NULL DEFAULT nextval('plots_id_seq'),
+    world_id          integer REFERENCES worlds (id),
+    territory_type_id integer REFERENCES districts (id),
+    ward_number       integer,
+    plot_number       integer,
+    "timestamp"       timestamp WITHOUT TIME ZONE NOT NULL,
+    sweep_id          integer REFERENCES wardsweeps (id) ON DELETE SET NULL,
+    event_id          integer REFERENCES events (id) ON DELETE CASCADE,
+    is_owned          boolean,
+    has_built_house   boolean,
+    house_price       integer,
+    owner_name        character varying,
+    PRIMARY KEY (id, "timestamp"),
+    FOREIGN KEY (territory_type_id, plot_number) REFERENCES plotinfo (territory_type_id, plot_number)
+) PARTITION BY RANGE ("timestamp");
+ALTER SEQUENCE plots_id_seq OWNED BY plots.id;
+
+CREATE TABLE plots_default PARTITION OF plots DEFAULT;
+SELECT create_plots_partition(month::date)
+FROM generate_series(date_trunc('month', (SELECT coalesce(min("timestamp"), now()) FROM plots_old)),
+                     date_trunc('month', now()) + '1 month'::interval,
+                     '1 month'::interval) AS month;
+
+-- copy data, then build indices once instead of maintaining them per row
+INSERT INTO plots
+SELECT *
+FROM plots_old;
+DROP TABLE plots_old;
+
+CREATE INDEX ix_plots_world_id_territory_type_id_ward_number_plot_number
+    ON plots (world_id, territory_type_id, ward_number, plot_number)
+    INCLUDE ("timestamp", owner_name, house_price, is_owned);
+CREATE INDEX ix_plots_ward_number_plot_number_timestamp_desc ON plots (ward_number, plot_number, "timestamp" DESC);
+CREATE INDEX ix_plots_sweep_id_desc ON plots (sweep_id DESC);
+CREATE INDEX ix_plots_event_id_desc ON plots (event_id DESC);
+
+ANALYZE plots;
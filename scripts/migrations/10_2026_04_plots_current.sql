@@ -0,0 +1,22 @@
+-- plots_current materialized view
+-- Oct 15, 2026
+-- Adds the following materialized views:
+-- plots_current: the latest row of plots for each (world_id, territory_type_id, ward_number, plot_number)
+--
+-- Adds the following indices:
+-- ix_plots_current_world_id_territory_type_id_ward_plot: unique, needed to refresh concurrently
+--
+-- Run after 10_2026_03_partition_plots.sql, which replaces the plots table this view depends on.
+--
+-- The server refreshes the view with REFRESH MATERIALIZED VIEW CONCURRENTLY after ingests, at most every
+-- PLOTS_CURRENT_REFRESH_INTERVAL seconds (default 30).
+
+CREATE MATERIALIZED VIEW plots_current AS
+SELECT DISTINCT ON (world_id, territory_type_id, ward_number, plot_number) *
+FROM plots
+ORDER BY world_id, territory_type_id, ward_number, plot_number, timestamp DESC;
+
+CREATE UNIQUE INDEX ix_plots_current_world_id_territory_type_id_ward_plot
+    ON plots_current (world_id, territory_type_id, ward_number, plot_number);
+
+ANALYZE plots_current;
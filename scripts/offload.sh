@@ -16,7 +16,11 @@ fi
 
 # dump, upload to s3
 sudo -u paissadb pg_dump --schema-only --no-owner -v -Z 9 paissadb | aws s3 cp - s3://paissadb-historical/paissadb-schema-${timestamp}.sql.gz
-sudo -u paissadb pg_dump --data-only --no-owner -t plots -t events -v -Z 3 paissadb | aws s3 cp - s3://paissadb-historical/paissadb-data-${timestamp}.sql.gz
+# plots is partitioned, so its rows live in the plots_YYYY_MM and plots_default partitions - dump those as well, written as
+# rows of plots so that the archive still loads into an unpartitioned plots table (see stats/tools)
+sudo -u paissadb pg_dump --data-only --no-owner --load-via-partition-root \
+  -t plots -t 'plots_[0-9]*' -t plots_default -t events \
+  -v -Z 3 paissadb | aws s3 cp - s3://paissadb-historical/paissadb-data-${timestamp}.sql.gz
 
 # if the upload succeeded, delete data older than 1 week
 if [[ $? == 0 ]]; then
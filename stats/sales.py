@@ -129,7 +129,7 @@ def t_processor():
             district = crud.get_district_by_id(db, district_id)
             world = crud.get_world_by_id(db, world_id)
             with timer(f'T-{threading.get_ident()}', f'{world_id}-{district_id} ({world.name}, {district.name})'):
-                latest_plots = crud.get_latest_plots_in_district(db, world_id, district_id)
+                latest_plots = crud.get_latest_plots_in_district(db, world_id, district_id, load_plot_info=True)
                 for plot in latest_plots:
                     statter = SaleStatGenerator(db, plot)
                     for result in statter.do_stats():
@@ -12,7 +12,7 @@ CREATE TABLE events
     sweeper_id  bigint,
     "timestamp" timestamp WITHOUT TIME ZONE,
     event_type  eventtype,
-    data        text
+    data        jsonb
 );
 
 CREATE TABLE plots
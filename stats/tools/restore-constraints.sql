@@ -12,7 +12,7 @@ CREATE TABLE public.events
     sweeper_id  bigint,
     "timestamp" timestamp WITHOUT TIME ZONE,
     event_type  public.eventtype,
-    data        text
+    data        jsonb
 );
 
 CREATE TABLE public.plots
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from paissadb import models
+
+WORLD_ID = 73
+DISTRICT_ID = 339
+HOUSE_BASE_PRICE = 3000000
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    # a file rather than :memory: so that the sync and async engines can open the same db
+    return tmp_path / "paissadb.db"
+
+
+@pytest.fixture()
+def db(db_path):
+    """A session on a fresh sqlite db, with one world and one district of 60 plots."""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine, autoflush=False, expire_on_commit=False) as sess:
+        sess.add(models.World(id=WORLD_ID, name="Adamantoise"))
+        sess.add(models.District(id=DISTRICT_ID, name="Mist", land_set_id=0))
+        sess.add_all(
+            models.PlotInfo(territory_type_id=DISTRICT_ID, plot_number=i, house_size=0,
+                            house_base_price=HOUSE_BASE_PRICE)
+            for i in range(60)
+        )
+        sess.commit()
+        yield sess
+    engine.dispose()
+
+
+@pytest.fixture()
+def async_session(db, db_path):
+    """Returns a factory for AsyncSessions (aiosqlite) on the same db as the *db* fixture."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    yield lambda: AsyncSession(engine, autoflush=False, expire_on_commit=False)
+    engine.sync_engine.dispose()
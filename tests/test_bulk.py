@@ -0,0 +1,54 @@
+import datetime
+
+from paissadb.bulk import _CopyReader, copy_line, copy_value
+from paissadb.models import EventType
+
+
+# ============= COPY text format =============
+def test_copy_value_null_and_scalars():
+    assert copy_value(None) == "\\N"
+    assert copy_value(True) == "t"
+    assert copy_value(False) == "f"
+    assert copy_value(0) == "0"
+    assert copy_value(17848800) == "17848800"
+    assert copy_value("") == ""
+    assert copy_value("Dummy Data") == "Dummy Data"
+
+
+def test_copy_value_enum_uses_name():
+    assert copy_value(EventType.HOUSING_WARD_INFO) == "HOUSING_WARD_INFO"
+
+
+def test_copy_value_datetime():
+    assert copy_value(datetime.datetime(2026, 10, 1, 12, 30, 5, 123)) == "2026-10-01T12:30:05.000123"
+    assert copy_value(datetime.date(2026, 10, 1)) == "2026-10-01"
+
+
+def test_copy_value_escapes():
+    assert copy_value("a\tb") == "a\\tb"
+    assert copy_value("a\nb\rc") == "a\\nb\\rc"
+    assert copy_value("a\\b") == "a\\\\b"
+    # a literal \N must not turn into a null
+    assert copy_value("\\N") == "\\\\N"
+
+
+def test_copy_value_json():
+    assert copy_value({"a": "b\tc"}) == '{"a": "b\\\\tc"}'
+    assert copy_value([1, None]) == "[1, null]"
+
+
+def test_copy_line():
+    assert copy_line((1, None, "x\ty", True)) == "1\t\\N\tx\\ty\tt\n"
+    assert copy_line(()) == "\n"
+
+
+def test_copy_reader_chunks():
+    rows = [(i, f"name {i}") for i in range(100)]
+    expected = "".join(copy_line(row) for row in rows)
+    reader = _CopyReader(iter(rows))
+    chunks = []
+    while chunk := reader.read(7):
+        chunks.append(chunk)
+    assert "".join(chunks) == expected
+    assert reader.num_rows == 100
+    assert _CopyReader(iter(rows)).read() == expected
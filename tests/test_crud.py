@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import json
+import os
+
+import cachetools
+import pytest
+
+from paissadb import calc, config, crud, models, schemas
+from .conftest import DISTRICT_ID, HOUSE_BASE_PRICE, WORLD_ID
+
+
+def add_wardsweep(db, ward_number=0, num_open=3) -> models.WardSweep:
+    timestamp = datetime.datetime.now()
+    event = models.Event(timestamp=timestamp, event_type=models.EventType.HOUSING_WARD_INFO, data={})
+    wardsweep = models.WardSweep(world_id=WORLD_ID, territory_type_id=DISTRICT_ID, ward_number=ward_number,
+                                 timestamp=timestamp, event=event)
+    for i in range(60):
+        is_owned = i >= num_open
+        wardsweep.plots.append(models.Plot(
+            world_id=WORLD_ID, territory_type_id=DISTRICT_ID, ward_number=ward_number, plot_number=i,
+            timestamp=timestamp, event=event, is_owned=is_owned, has_built_house=is_owned,
+            house_price=HOUSE_BASE_PRICE, owner_name="Dummy Data" if is_owned else ""
+        ))
+    db.add(wardsweep)
+    db.commit()
+    return wardsweep
+
+
+def test_wardsweep_by_id_after_district_detail(db):
+    # the flat plot_info selectin load in district detail used to break the nested one in get_wardsweep_by_id
+    wardsweep_id = add_wardsweep(db).id
+    db.expunge_all()
+
+    world = crud.get_world_by_id(db, WORLD_ID)
+    district = crud.get_district_by_id(db, DISTRICT_ID)
+    detail = calc.get_district_detail(db, world, district)
+    assert detail.num_open_plots == 3
+
+    wardsweep = crud.get_wardsweep_by_id(db, wardsweep_id)
+    assert len(wardsweep.plots) == 60
+    assert all(p.plot_info.house_base_price == HOUSE_BASE_PRICE for p in wardsweep.plots)
+
+
+def test_refresh_plots_current_keeps_stale_districts_on_failure(monkeypatch):
+    class FailingSession:
+        def execute(self, *args, **kwargs):
+            raise RuntimeError("refresh failed")
+
+    monkeypatch.setattr(config, "DB_TYPE", "postgresql")
+    monkeypatch.setattr(crud, "plots_current_stale", {(WORLD_ID, DISTRICT_ID)})
+    with pytest.raises(RuntimeError):
+        crud.refresh_plots_current(FailingSession())
+    assert crud.plots_current_stale == {(WORLD_ID, DISTRICT_ID)}
+
+
+def test_strip_null_chars():
+    assert crud._strip_null_chars({"a\x00": ["b\x00c", 1, None, {"d": "\x00"}]}) == {"a": ["bc", 1, None, {"d": ""}]}
+    # only actual null characters are removed, not text that looks like their escape
+    assert crud._strip_null_chars("a\\u0000b") == "a\\u0000b"
+
+
+def test_ingest_wardinfo(db, async_session, monkeypatch):
+    with open(os.path.join(os.path.dirname(__file__), "static/dummy_ward_info.json")) as f:
+        data = json.load(f)
+    data["LandIdent"]["WorldId"] = WORLD_ID
+    wardinfo = schemas.ffxiv.HousingWardInfo.parse_obj(data)
+    db.add(models.Sweeper(id=31415, name="Dummy Sweeper", world_id=WORLD_ID))
+    db.commit()
+
+    monkeypatch.setattr(crud, "district_plot_cache", cachetools.LRUCache(288))
+    monkeypatch.setattr(crud, "plots_current_stale", set())
+    crud.district_plot_cache[WORLD_ID, DISTRICT_ID] = [1, 2, 3]
+
+    async def ingest():
+        async with async_session() as adb:
+            return await crud.ingest_wardinfo(adb, wardinfo, schemas.paissa.JWTSweeper(cid=31415))
+
+    wardsweep_id = asyncio.run(ingest())
+
+    wardsweep = crud.get_wardsweep_by_id(db, wardsweep_id)
+    assert (wardsweep.sweeper_id, wardsweep.world_id, wardsweep.territory_type_id, wardsweep.ward_number) \
+           == (31415, WORLD_ID, DISTRICT_ID, 0)
+    event = db.get(models.Event, wardsweep.event_id)
+    assert event.sweeper_id == 31415
+    assert event.event_type == models.EventType.HOUSING_WARD_INFO
+    assert event.data["LandIdent"]["WorldId"] == WORLD_ID
+    assert event.timestamp == wardsweep.timestamp
+
+    plots = sorted(wardsweep.plots, key=lambda p: p.plot_number)
+    assert [p.plot_number for p in plots] == list(range(60))
+    assert all(p.event_id == event.id and p.sweep_id == wardsweep_id for p in plots)
+    assert all(p.timestamp == wardsweep.timestamp for p in plots)
+    for plot, entry in zip(plots, wardinfo.HouseInfoEntries):
+        assert plot.house_price == entry.HousePrice
+        assert plot.is_owned == bool(entry.InfoFlags & schemas.ffxiv.HousingFlags.PlotOwned)
+
+    assert (WORLD_ID, DISTRICT_ID) not in crud.district_plot_cache
+    assert crud.plots_current_stale == {(WORLD_ID, DISTRICT_ID)}
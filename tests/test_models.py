@@ -0,0 +1,51 @@
+import datetime
+
+from sqlalchemy import select
+
+from paissadb.models import Plot, PlotInfo
+from .conftest import DISTRICT_ID, HOUSE_BASE_PRICE, WORLD_ID
+
+
+def plot_with_price(house_price, house_base_price):
+    plot = Plot(house_price=house_price)
+    plot.plot_info = PlotInfo(house_base_price=house_base_price)
+    return plot
+
+
+# ============= num_devals =============
+class TestNumDevals:
+    def test_unknown_price(self):
+        assert plot_with_price(None, 3000000).num_devals is None
+
+    def test_at_or_above_base_price(self):
+        assert plot_with_price(3000000, 3000000).num_devals == 0
+        assert plot_with_price(3500000, 3000000).num_devals == 0
+
+    def test_devals(self):
+        # each devalue takes 0.42% off the base price
+        for base_price in (3000000, 4000000, 16000000, 40000000):
+            for n in range(1, 200):
+                price = int(base_price * (1 - 0.0042 * n))
+                assert plot_with_price(price, base_price).num_devals == n
+
+    def test_rounds_to_nearest(self):
+        # 0.42% of 3m is 12600
+        assert plot_with_price(3000000 - 12600 - 6299, 3000000).num_devals == 1
+        assert plot_with_price(3000000 - 12600 - 6300, 3000000).num_devals == 2
+        assert plot_with_price(3000000 - 6299, 3000000).num_devals == 0
+
+    def test_query_matches_python(self, db):
+        prices = [None, HOUSE_BASE_PRICE, HOUSE_BASE_PRICE + 500000, HOUSE_BASE_PRICE - 1, HOUSE_BASE_PRICE - 6300,
+                  int(HOUSE_BASE_PRICE * (1 - 0.0042 * 5)), int(HOUSE_BASE_PRICE * (1 - 0.0042 * 100)), 1]
+        db.add_all(
+            Plot(world_id=WORLD_ID, territory_type_id=DISTRICT_ID, ward_number=0, plot_number=i,
+                 timestamp=datetime.datetime.now(), house_price=price)
+            for i, price in enumerate(prices)
+        )
+        db.commit()
+        db.expunge_all()
+
+        rows = db.execute(select(Plot.id, Plot.num_devals).order_by(Plot.plot_number)).all()
+        assert [num_devals for _, num_devals in rows] == [None, 0, 0, 0, 1, 5, 100, 238]
+        for plot_id, num_devals in rows:
+            assert db.get(Plot, plot_id).num_devals == num_devals